@@ -0,0 +1,321 @@
+import os
+import sys
+import ctypes
+import ctypes.util
+import threading
+import numpy as np
+from PIL import Image, ImageGrab
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFFFFFFFFFF if ctypes.sizeof(ctypes.c_ulong) == 8 else 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+class XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("resourceid", ctypes.c_ulong),
+        ("serial", ctypes.c_ulong),
+        ("error_code", ctypes.c_ubyte),
+        ("request_code", ctypes.c_ubyte),
+        ("minor_code", ctypes.c_ubyte),
+    ]
+
+XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(XErrorEvent))
+
+class XImage(ctypes.Structure):
+    # Только начальные поля структуры XImage, которые нам нужны
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+class ImageGrabBackend:
+    """Захват через PIL.ImageGrab — работает везде, но выделяет новый кадр на каждый вызов"""
+
+    name = "imagegrab"
+
+    def grab(self, bbox=None):
+        return ImageGrab.grab(bbox=bbox)
+
+    def grab_array(self, bbox=None):
+        """BGRA-массив области в том же формате, что и у XShmBackend"""
+        rgb = np.asarray(ImageGrab.grab(bbox=bbox).convert('RGB'))
+        frame = np.empty(rgb.shape[:2] + (4,), dtype=np.uint8)
+        frame[..., :3] = rgb[..., ::-1]
+        frame[..., 3] = 255
+        return frame
+
+    def release_buffers(self):
+        pass
+
+    def close(self):
+        pass
+
+class XShmBackend:
+    """Захват X11 через MIT-SHM: только запрошенная область в переиспользуемый буфер NumPy"""
+
+    name = "xshm"
+
+    def __init__(self, display_name=None):
+        if not sys.platform.startswith('linux'):
+            raise OSError("MIT-SHM доступен только в Linux/X11")
+
+        x11_path = ctypes.util.find_library('X11')
+        xext_path = ctypes.util.find_library('Xext')
+        if not x11_path or not xext_path:
+            raise OSError("Не найдены библиотеки libX11/libXext")
+
+        self.x11 = ctypes.CDLL(x11_path)
+        self.xext = ctypes.CDLL(xext_path)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._declare_functions()
+
+        display = (display_name or os.environ.get('DISPLAY', '')).encode()
+        self.display = self.x11.XOpenDisplay(display or None)
+        if not self.display:
+            raise OSError("Не удалось подключиться к X-серверу")
+
+        if not self.xext.XShmQueryExtension(self.display):
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
+            raise OSError("X-сервер не поддерживает MIT-SHM")
+
+        screen = self.x11.XDefaultScreen(self.display)
+        self.root = self.x11.XDefaultRootWindow(self.display)
+        self.visual = self.x11.XDefaultVisual(self.display, screen)
+        self.depth = self.x11.XDefaultDepth(self.display, screen)
+
+        self.lock = threading.RLock()
+        self.image = None
+        self.shminfo = None
+        self.buffer = None
+        # Ссылка на обработчик должна жить, пока он может быть установлен в Xlib
+        self.x_error = None
+        self.error_handler = XErrorHandler(self._on_x_error)
+
+        try:
+            self.screen_size = self.root_size()
+            # Пробное подключение сегмента: на удаленных дисплеях XShmAttach дает BadAccess
+            self._allocate(1, 1)
+            self._release()
+        except Exception:
+            self.close()
+            raise
+
+    def _declare_functions(self):
+        x11, xext, libc = self.x11, self.xext, self.libc
+
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XSetErrorHandler.argtypes = [XErrorHandler]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XGetGeometry.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint),
+            ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint)
+        ]
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint
+        ]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+            ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _on_x_error(self, display, event):
+        self.x_error = event.contents.error_code
+        return 0
+
+    def _checked(self, call, message):
+        """Вызов Xlib с перехватом асинхронных ошибок: стандартный обработчик завершает процесс"""
+        self.x_error = None
+        previous = self.x11.XSetErrorHandler(self.error_handler)
+        try:
+            result = call()
+            self.x11.XSync(self.display, 0)
+        finally:
+            self.x11.XSetErrorHandler(ctypes.cast(previous, XErrorHandler) if previous else XErrorHandler())
+        if self.x_error is not None:
+            raise OSError(f"{message}: ошибка X {self.x_error}")
+        return result
+
+    def root_size(self):
+        """Текущий размер корневого окна (меняется после xrandr)"""
+        root = ctypes.c_ulong()
+        x, y = ctypes.c_int(), ctypes.c_int()
+        width, height, border, depth = ctypes.c_uint(), ctypes.c_uint(), ctypes.c_uint(), ctypes.c_uint()
+        self._checked(lambda: self.x11.XGetGeometry(
+            self.display, self.root, ctypes.byref(root), ctypes.byref(x), ctypes.byref(y),
+            ctypes.byref(width), ctypes.byref(height), ctypes.byref(border), ctypes.byref(depth)
+        ), "XGetGeometry не удался")
+        return width.value, height.value
+
+    def _allocate(self, width, height):
+        """Создание (или переиспользование) разделяемого буфера под область width x height"""
+        if self.image is not None and self.image.contents.width == width and self.image.contents.height == height:
+            return
+
+        self._release()
+
+        shminfo = XShmSegmentInfo()
+        image = self.xext.XShmCreateImage(
+            self.display, self.visual, self.depth, ZPIXMAP, None, ctypes.byref(shminfo), width, height
+        )
+        if not image:
+            raise OSError("XShmCreateImage не удался")
+
+        if image.contents.bits_per_pixel != 32:
+            self.x11.XFree(image)
+            raise OSError("Поддерживается только 32-битный формат пикселей")
+
+        size = image.contents.bytes_per_line * height
+        shminfo.shmid = self.libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            self.x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmget не удался")
+
+        address = self.libc.shmat(shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            self.x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmat не удался")
+
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        image.contents.data = address
+
+        try:
+            self._checked(lambda: self.xext.XShmAttach(self.display, ctypes.byref(shminfo)), "XShmAttach не удался")
+        except OSError:
+            image.contents.data = None
+            self.x11.XFree(image)
+            self.libc.shmdt(address)
+            raise
+        finally:
+            # Сегмент удалится автоматически после отсоединения обоих процессов
+            self.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+
+        raw = np.ctypeslib.as_array(
+            ctypes.cast(address, ctypes.POINTER(ctypes.c_uint8)),
+            shape=(height, image.contents.bytes_per_line)
+        )
+        self.buffer = raw.reshape(height, -1, 4)[:, :width]
+        self.image = image
+        self.shminfo = shminfo
+
+    def _release(self):
+        if self.image is None:
+            return
+        try:
+            self._checked(lambda: self.xext.XShmDetach(self.display, ctypes.byref(self.shminfo)), "XShmDetach не удался")
+        except OSError:
+            pass
+        self.image.contents.data = None
+        self.x11.XFree(self.image)
+        self.libc.shmdt(self.shminfo.shmaddr)
+        self.image = None
+        self.shminfo = None
+        self.buffer = None
+
+    def grab_array(self, bbox=None):
+        """BGRA-массив области; буфер переиспользуется и валиден до следующего захвата"""
+        with self.lock:
+            self.screen_size = self.root_size()
+            x1, y1, x2, y2 = bbox or (0, 0) + self.screen_size
+            width, height = x2 - x1, y2 - y1
+            if width <= 0 or height <= 0:
+                raise ValueError("Пустая область захвата")
+            if x1 < 0 or y1 < 0 or x2 > self.screen_size[0] or y2 > self.screen_size[1]:
+                raise ValueError(f"Область {bbox} выходит за пределы экрана {self.screen_size}")
+
+            self._allocate(width, height)
+            grabbed = self._checked(
+                lambda: self.xext.XShmGetImage(self.display, self.root, self.image, x1, y1, ALL_PLANES),
+                "XShmGetImage не удался"
+            )
+            if not grabbed:
+                raise OSError("XShmGetImage не удался")
+            return self.buffer
+
+    def grab(self, bbox=None):
+        """Копия области в PIL-изображении; конвейер OCR берет кадр напрямую через grab_array"""
+        with self.lock:
+            buffer = self.grab_array(bbox)
+            height, width = buffer.shape[:2]
+            return Image.frombuffer('RGB', (width, height), buffer, 'raw', 'BGRX', 0, 1)
+
+    def release_buffers(self):
+        """Освобождение разделяемого буфера (режим экономии памяти)"""
+        with self.lock:
+            self._release()
+
+    def close(self):
+        with self.lock:
+            self._release()
+            if self.display:
+                self.x11.XCloseDisplay(self.display)
+                self.display = None
+
+CAPTURE_BACKENDS = {
+    XShmBackend.name: XShmBackend,
+    ImageGrabBackend.name: ImageGrabBackend,
+}
+
+def get_capture_backend(preferred=None):
+    """Первый доступный бэкенд захвата; ImageGrab — запасной вариант"""
+    preferred = preferred or os.environ.get('OCR_CAPTURE_BACKEND')
+    names = [preferred] if preferred in CAPTURE_BACKENDS else []
+    names += [name for name in CAPTURE_BACKENDS if name not in names]
+
+    for name in names:
+        try:
+            return CAPTURE_BACKENDS[name]()
+        except Exception:
+            continue
+
+    return ImageGrabBackend()
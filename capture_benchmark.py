@@ -0,0 +1,58 @@
+"""Микробенчмарк задержки захвата экрана по бэкендам и разрешениям.
+
+Запуск (в том числе под Xvfb):
+    xvfb-run -s "-screen 0 1920x1080x24" python capture_benchmark.py --repeat 50
+"""
+import argparse
+import time
+import numpy as np
+from capture import CAPTURE_BACKENDS
+
+RESOLUTIONS = [
+    (320, 240),
+    (640, 480),
+    (1280, 720),
+    (1920, 1080),
+]
+
+def measure(backend, bbox, repeat, warmup=3):
+    for _ in range(warmup):
+        backend.grab_array(bbox)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.grab_array(bbox)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return np.array(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение задержки захвата экрана")
+    parser.add_argument("--repeat", type=int, default=30, help="число замеров на разрешение")
+    parser.add_argument("--backend", choices=list(CAPTURE_BACKENDS), action="append",
+                        help="бэкенд для замера (по умолчанию все доступные)")
+    args = parser.parse_args()
+
+    print(f"{'backend':<10} {'region':>10} {'mean, ms':>10} {'p50, ms':>10} {'p95, ms':>10}")
+
+    for name in args.backend or list(CAPTURE_BACKENDS):
+        try:
+            backend = CAPTURE_BACKENDS[name]()
+        except Exception as e:
+            print(f"{name:<10} недоступен: {e}")
+            continue
+
+        try:
+            screen_size = getattr(backend, 'screen_size', None)
+            for width, height in RESOLUTIONS:
+                if screen_size and (width > screen_size[0] or height > screen_size[1]):
+                    continue
+                timings = measure(backend, (0, 0, width, height), args.repeat)
+                print(f"{name:<10} {f'{width}x{height}':>10} {timings.mean():>10.2f} "
+                      f"{np.percentile(timings, 50):>10.2f} {np.percentile(timings, 95):>10.2f}")
+        finally:
+            backend.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Нагрузочный тест конвейера OCR + перевод без сети.
+
+Поднимает локальную заглушку перевода (loadtest_server.py), прогоняет множество
+параллельных заданий через настоящие extract_text/translate_text/translate_segments
+и печатает пропускную способность, хвостовые задержки и долю деградировавших ответов.
+Задания трех видов: короткий текст (с OCR, если он включен), длинный текст
+больше 500 символов и многостраничный документ — два последних идут через translate_batch.
+
+    python loadtest.py --jobs 200 --workers 16 --latency lognormal:-2.3,0.6 --error-rate 0.1 --rate-limit 30
+    python loadtest.py --skip-ocr --max-p95 3.0 --max-degraded 0.05   # гейт для релиза
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from loadtest_server import TranslateStubServer, fake_translate, parse_latency
+
+SAMPLE_LINES = [
+    "Settings",
+    "Display brightness and color temperature",
+    "Check for updates automatically. Restart required to apply changes.",
+    "Network proxy configuration",
+    "Save",
+    "Cancel",
+    "Keyboard shortcuts and accessibility options",
+]
+JOB_KINDS = ('short', 'long', 'pages')
+
+def render_sample(path, lines):
+    font = ImageFont.load_default()
+    image = Image.new('L', (200, 14 * len(lines) + 10), 255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((5, 5 + index * 14), line, fill=0, font=font)
+    image = image.resize((image.width * 4, image.height * 4), Image.Resampling.BICUBIC)
+    image.save(path)
+
+def make_pipeline(main_module, source_lang, with_ocr):
+    class HeadlessPipeline(main_module.ScreenTranslator):
+        """Настоящие методы конвейера без интерфейса Flet"""
+
+        def __init__(self):
+            self.reader = main_module.create_reader(['en', 'ru']) if with_ocr else None
+            self.reader_langs = ['en', 'ru'] if with_ocr else None
+            self.additional_readers = {}
+            self.additional_reader_langs = {}
+            self.models_lock = main_module.threading.RLock()
+            self.frame_bytes = 0
+            self.source_lang = SimpleNamespace(value=source_lang)
+            self.current_source = "file"
+            self.preprocess_selector = main_module.PreprocessSelector()
+            self.batch_mismatches = 0
+
+    return HeadlessPipeline()
+
+def make_job(index, workdir, with_ocr):
+    lines = SAMPLE_LINES[index % len(SAMPLE_LINES):] + SAMPLE_LINES[:index % len(SAMPLE_LINES)]
+    kind = JOB_KINDS[index % len(JOB_KINDS)]
+    path = None
+
+    if kind == 'short':
+        texts = [' '.join(lines[:4])]
+        if with_ocr:
+            path = os.path.join(workdir, f"job_{index}.png")
+            render_sample(path, lines[:4])
+    elif kind == 'long':
+        texts = [' '.join(line.rstrip('.') + '.' for line in lines * 3)]
+    else:
+        texts = [' '.join(lines[i:i + 2]) for i in range(0, len(lines), 2)]
+
+    return {'kind': kind, 'path': path, 'texts': texts}
+
+def run_job(pipeline, job, source_lang, target_lang):
+    started = time.perf_counter()
+    outcome = 'ok'
+    ocr_seconds = 0.0
+
+    try:
+        if job['path']:
+            texts = [pipeline.extract_text(job['path'])]
+            ocr_seconds = time.perf_counter() - started
+        else:
+            texts = job['texts']
+
+        if len(texts) > 1:
+            translated = pipeline.translate_segments(texts, source_lang, target_lang)
+        else:
+            translated = [pipeline.translate_text(texts[0], source_lang, target_lang)]
+        if any("[Ошибка перевода" in part for part in translated):
+            outcome = 'degraded'
+    except Exception:
+        outcome = 'failed'
+
+    return {
+        'kind': job['kind'],
+        'outcome': outcome,
+        'latency': time.perf_counter() - started,
+        'ocr': ocr_seconds,
+    }
+
+def self_check(pipeline, server, target_lang):
+    """Запросы без задержек и ошибок: заглушка и клиент должны понимать друг друга.
+
+    Пакет из нескольких сегментов обязан уложиться в один запрос — иначе разделитель
+    не пережил разбор ответа и translate_batch откатился на посегментный перевод.
+    """
+    saved = server.latency, server.error_rate, server.rate_limiter
+    server.latency, server.error_rate, server.rate_limiter = parse_latency("none"), 0.0, None
+    try:
+        text = "Self check"
+        translated = pipeline.translate_text(text, "en", target_lang)
+        stats = dict(server.stats)
+        server.stats.clear()
+
+        segments = SAMPLE_LINES[:3]
+        batch = pipeline.translate_batch(segments, "en", target_lang)
+        batch_stats = dict(server.stats)
+        mismatches = pipeline.batch_mismatches
+    finally:
+        server.latency, server.error_rate, server.rate_limiter = saved
+        server.stats.clear()
+        pipeline.batch_mismatches = 0
+
+    if translated != fake_translate(text, target_lang) or stats != {'ok': 1}:
+        raise RuntimeError(f"Самопроверка не пройдена: ответ {translated!r}, сервер {stats}")
+    if batch_stats != {'ok': 1} or mismatches or len(batch) != len(segments):
+        raise RuntimeError(f"Самопроверка пакета не пройдена: ответ {batch!r}, сервер {batch_stats}")
+
+def summarize(results, wall_seconds, server_stats):
+    latencies = np.array([result['latency'] for result in results])
+    outcomes = {}
+    outcomes_by_kind = {}
+    for result in results:
+        outcomes[result['outcome']] = outcomes.get(result['outcome'], 0) + 1
+        kind_outcomes = outcomes_by_kind.setdefault(result['kind'], {})
+        kind_outcomes[result['outcome']] = kind_outcomes.get(result['outcome'], 0) + 1
+
+    return {
+        'jobs': len(results),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_jobs_per_s': round(len(results) / wall_seconds, 3) if wall_seconds else 0.0,
+        'latency_s': {
+            'p50': round(float(np.percentile(latencies, 50)), 3),
+            'p95': round(float(np.percentile(latencies, 95)), 3),
+            'p99': round(float(np.percentile(latencies, 99)), 3),
+            'max': round(float(latencies.max()), 3),
+        },
+        'ocr_mean_s': round(float(np.mean([result['ocr'] for result in results])), 3),
+        'outcomes': outcomes,
+        'outcomes_by_kind': outcomes_by_kind,
+        'degraded_fraction': round((outcomes.get('degraded', 0) + outcomes.get('failed', 0)) / len(results), 4),
+        'server': server_stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест OCR + перевода с локальной заглушкой")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:-2.3,0.6", help="распределение задержки заглушки")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--source-lang", default="auto")
+    parser.add_argument("--target-lang", default="ru")
+    parser.add_argument("--skip-ocr", action="store_true", help="переводить эталонный текст без распознавания")
+    parser.add_argument("--max-p95", type=float, default=None, help="порог p95 задержки, с")
+    parser.add_argument("--max-degraded", type=float, default=None, help="порог доли деградировавших заданий")
+    args = parser.parse_args()
+
+    server = TranslateStubServer(('127.0.0.1', 0), args.latency, args.error_rate, args.rate_limit)
+    server.start_background()
+
+    host = server.service_url.split('://', 1)[1]
+    os.environ['OCR_TRANSLATE_SERVICE_URLS'] = host
+
+    import googletrans.urls
+    for name in ('TRANSLATE', 'TRANSLATE_RPC'):
+        if hasattr(googletrans.urls, name):
+            setattr(googletrans.urls, name, getattr(googletrans.urls, name).replace('https://', 'http://'))
+
+    import main as main_module
+    pipeline = make_pipeline(main_module, args.source_lang, not args.skip_ocr)
+
+    try:
+        self_check(pipeline, server, args.target_lang)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        jobs = [make_job(index, workdir, not args.skip_ocr) for index in range(args.jobs)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(
+                lambda job: run_job(pipeline, job, args.source_lang, args.target_lang), jobs
+            ))
+        wall_seconds = time.perf_counter() - started
+
+    server.shutdown()
+    server.server_close()
+
+    report = summarize(results, wall_seconds, server.stats)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failed_gates = []
+    if args.max_p95 is not None and report['latency_s']['p95'] > args.max_p95:
+        failed_gates.append(f"p95 {report['latency_s']['p95']} с > {args.max_p95} с")
+    if args.max_degraded is not None and report['degraded_fraction'] > args.max_degraded:
+        failed_gates.append(f"деградация {report['degraded_fraction']} > {args.max_degraded}")
+
+    if failed_gates:
+        print("Гейт не пройден: " + "; ".join(failed_gates), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Локальная заглушка Google Translate для нагрузочных тестов без сети.
+
+Имитирует batchexecute-эндпоинт, который использует googletrans 4.x, с настраиваемой
+задержкой, долей ошибок и ограничением частоты запросов. Перевод возвращается частями
+по предложениям, как у Google: клиент склеивает их пробелом, и переводы строк теряются.
+
+    python loadtest_server.py --port 8765 --latency lognormal:-2.3,0.6 --error-rate 0.05 --rate-limit 20
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RPC_ID = "MkEWBc"
+
+try:
+    from googletrans import urls as googletrans_urls
+    # Путь берется у клиента, чтобы заглушка не расходилась с установленной версией
+    RPC_PATH = urlparse(googletrans_urls.TRANSLATE_RPC.format(host='localhost')).path
+except (ImportError, AttributeError):
+    RPC_PATH = "/_/TranslateWebserverUi/data/batchexecute"
+
+def parse_latency(spec):
+    """Генератор задержки (в секундах) из строки вида 'kind:arg1,arg2'.
+
+    fixed:0.1 · uniform:0.05,0.5 · exp:0.2 · lognormal:mu,sigma · none
+    """
+    kind, _, raw_args = spec.partition(':')
+    args = [float(value) for value in raw_args.split(',') if value]
+
+    if kind in ('none', ''):
+        return lambda: 0.0
+    if kind == 'fixed':
+        return lambda: args[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(args[0], args[1])
+    if kind == 'exp':
+        return lambda: random.expovariate(1 / args[0])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(args[0], args[1])
+
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+def fake_translate(text, dest):
+    """Детерминированный «перевод» одного предложения"""
+    return f"[{dest}] {text}"
+
+def split_sentences(text):
+    """Предложения в том виде, в каком Google возвращает их отдельными частями"""
+    return [sentence.strip() for sentence in re.split(r'(?<=[.!?])\s+|\n+', text) if sentence.strip()]
+
+def build_response(text, src, dest):
+    detected = 'en' if src == 'auto' else src
+    parts = [[fake_translate(sentence, dest), None] for sentence in split_sentences(text)]
+    parsed = [
+        [None, None, detected],
+        [[[None, None, None, True, None, parts]], dest],
+        detected,
+    ]
+    envelope = [["wrb.fr", RPC_ID, json.dumps(parsed, ensure_ascii=False), None, None, None, "generic"]]
+    payload = json.dumps(envelope, ensure_ascii=False)
+    return f")]}}'\n\n{len(payload)}\n{payload}\n"
+
+class TranslateStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json; charset=utf-8"):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(200, "<html>translate stub</html>", "text/html; charset=utf-8")
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8', errors='ignore')
+
+        if urlparse(self.path).path != RPC_PATH:
+            server.record('not_found')
+            self._reply(404, "not found")
+            return
+
+        if server.rate_limiter and not server.rate_limiter.take():
+            server.record('rate_limited')
+            self._reply(429, "rate limited")
+            return
+
+        time.sleep(max(0.0, server.latency()))
+
+        if random.random() < server.error_rate:
+            server.record('error')
+            self._reply(500, "internal error")
+            return
+
+        try:
+            request = json.loads(parse_qs(body)['f.req'][0])
+            text, src, dest = json.loads(request[0][0][1])[0][:3]
+        except Exception:
+            server.record('bad_request')
+            self._reply(400, "bad request")
+            return
+
+        server.record('ok')
+        self._reply(200, build_response(text, src, dest))
+
+class TranslateStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency="none", error_rate=0.0, rate_limit=None):
+        super().__init__(address, TranslateStubHandler)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def service_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка Google Translate")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="none", help="распределение задержки, например lognormal:-2.3,0.6")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="запросов в секунду до ответа 429")
+    args = parser.parse_args()
+
+    server = TranslateStubServer((args.host, args.port), args.latency, args.error_rate, args.rate_limit)
+    print(f"Заглушка перевода: {server.service_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import flet as ft
-import easyocr
 import cv2
 import numpy as np
 import threading
@@ -10,8 +9,13 @@ import subprocess
 import tempfile
 import atexit
 from googletrans import Translator
-from PIL import Image, ImageGrab, ImageEnhance, ImageFilter
+from capture import ImageGrabBackend, get_capture_backend
+from memory import LOW_MEMORY_MODE, IDLE_MODEL_TIMEOUT, MemoryMonitor, configure_low_memory, format_snapshot, memory_snapshot, models_nbytes, release_memory
+from model_cache import create_reader, release_shared_detector
+from preprocessing import PreprocessSelector, apply_variant, apply_variant_strips, confidence_score, image_stats, upscale
+from PIL import Image, ImageGrab, ImageEnhance, ImageFilter, ImageSequence
 import io
+import base64
 
 warnings.filterwarnings("ignore", category=UserWarning)
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
@@ -20,9 +24,7 @@ def cleanup_temp_files():
     temp_files = [
         "temp_area_screenshot.png",
         "temp_fullscreen.png", 
-        "temp_clipboard.png",
-        "temp_preview.png",
-        "temp_processed_simple.png"
+        "temp_clipboard.png"
     ]
     
     for temp_file in temp_files:
@@ -34,17 +36,76 @@ def cleanup_temp_files():
 
 atexit.register(cleanup_temp_files)
 
+BATCH_MAX_CHARS = 4500
+# googletrans 4.0.0rc1 склеивает части ответа пробелом и теряет переводы строк,
+# поэтому сегменты разделяются маркером; символ '|' не встречается в тексте OCR (см. format_results)
+BATCH_DELIMITER = " ||| "
+BATCH_MAX_MISMATCHES = 2
+UI_FRAME_INTERVAL = 1 / 30
+OCR_BATCH_SIZE = 4
+MAX_PREPROCESS_ATTEMPTS = 2
+TRANSLATE_SERVICE_URLS = [url.strip() for url in os.environ.get('OCR_TRANSLATE_SERVICE_URLS', '').split(',') if url.strip()]
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.tif')
+
+class UIUpdateCoalescer:
+    """Объединение изменений интерфейса: не более одного page.update() за кадр"""
+    
+    def __init__(self, page, interval=UI_FRAME_INTERVAL):
+        self.page = page
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.timer = None
+        self.last_flush = 0.0
+        
+    def request_update(self):
+        with self.lock:
+            if self.timer is not None:
+                return
+            delay = max(0.0, self.last_flush + self.interval - time.monotonic())
+            self.timer = threading.Timer(delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+            
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.last_flush = time.monotonic()
+        try:
+            self.page.update()
+        except Exception:
+            pass
+
 class ScreenTranslator:
     def __init__(self, page: ft.Page):
         self.page = page
         self.reader = None
         self.translator = None
         self.additional_readers = {}
+        self.reader_langs = None
+        self.additional_reader_langs = {}
+        self.models_lock = threading.RLock()
+        self.active_jobs = 0
+        self.last_ocr_time = time.monotonic()
+        self.frame_bytes = 0
+        self.preview_bytes = 0
         self.current_image_path = None
+        self.current_image_paths = []
+        self.current_source = "file"
+        self.current_frame = None
+        self.preprocess_selector = PreprocessSelector()
+        self.batch_mismatches = 0
+        self.capture_backend = None
+        self.capture_lock = threading.Lock()
+        self.ui = UIUpdateCoalescer(page)
         
         self.setup_ui()
         self.setup_ocr_and_translator()
         
+        self.memory_monitor = MemoryMonitor(self.refresh_memory_panel)
+        self.memory_monitor.start()
+        
     def setup_ui(self):
         self.page.title = "🌐 OCR Screen Translator by @florichdev"
         self.page.theme_mode = ft.ThemeMode.DARK
@@ -281,11 +342,21 @@ class ScreenTranslator:
         
         self.status_icon = ft.Icon(ft.Icons.CHECK_CIRCLE, size=20, color=ft.Colors.GREEN_400)
         
+        self.memory_text = ft.Text(
+            "Память: измерение...",
+            size=12,
+            color=ft.Colors.GREY_500,
+            text_align=ft.TextAlign.CENTER
+        )
+        
         status_container = ft.Container(
-            content=ft.Row([
-                self.status_icon,
-                self.status_text
-            ], alignment=ft.MainAxisAlignment.CENTER, spacing=10),
+            content=ft.Column([
+                ft.Row([
+                    self.status_icon,
+                    self.status_text
+                ], alignment=ft.MainAxisAlignment.CENTER, spacing=10),
+                self.memory_text
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=5),
             padding=ft.padding.all(15),
             bgcolor=ft.Colors.SURFACE,
             border_radius=15
@@ -313,6 +384,9 @@ class ScreenTranslator:
             try:
                 self.update_status("Инициализация OCR...", ft.Colors.ORANGE_400, ft.Icons.SETTINGS)
                 
+                if LOW_MEMORY_MODE:
+                    configure_low_memory()
+                
                 language_sets = [
                     ['en', 'ru'],
                     ['en'],
@@ -321,7 +395,8 @@ class ScreenTranslator:
                 ocr_initialized = False
                 for lang_set in language_sets:
                     try:
-                        self.reader = easyocr.Reader(lang_set, gpu=False, verbose=False)
+                        self.reader = create_reader(lang_set)
+                        self.reader_langs = lang_set
                         ocr_initialized = True
                         self.update_status(f"OCR инициализирован с языками: {', '.join(lang_set)}", ft.Colors.BLUE_400, ft.Icons.VISIBILITY)
                         break
@@ -334,7 +409,7 @@ class ScreenTranslator:
                 self.update_status("Инициализация переводчика...", ft.Colors.ORANGE_400, ft.Icons.TRANSLATE)
                 
                 try:
-                    self.translator = Translator()
+                    self.translator = self.create_translator()
                     test_result = self.translator.translate("test", dest="ru")
                     if test_result and hasattr(test_result, 'text'):
                         self.update_status("Переводчик инициализирован", ft.Colors.BLUE_400, ft.Icons.TRANSLATE)
@@ -342,22 +417,28 @@ class ScreenTranslator:
                         raise Exception("Тест переводчика не прошел")
                 except Exception as e:
                     self.update_status("Переводчик работает в ограниченном режиме", ft.Colors.ORANGE_400, ft.Icons.WARNING)
-                    self.translator = Translator()
+                    self.translator = self.create_translator()
                 
-                self.update_status("Загрузка дополнительных языков...", ft.Colors.ORANGE_400, ft.Icons.DOWNLOAD)
-                additional_languages = ['ja', 'ko', 'uk']
+                additional_languages = {
+                    'ja': ['ja', 'en'],
+                    'ko': ['ko', 'en'],
+                    'uk': ['uk', 'ru', 'en'],
+                }
                 
-                for lang in additional_languages:
-                    try:
-                        if lang == 'uk':
-                            reader = easyocr.Reader(['uk', 'ru', 'en'], gpu=False, verbose=False)
-                        else:
-                            reader = easyocr.Reader([lang, 'en'], gpu=False, verbose=False)
-                        self.additional_readers[lang] = reader
-                    except Exception:
-                        pass
+                if LOW_MEMORY_MODE:
+                    # Дополнительные языки загружаются только при первом обращении
+                    self.additional_reader_langs = additional_languages
+                else:
+                    self.update_status("Загрузка дополнительных языков...", ft.Colors.ORANGE_400, ft.Icons.DOWNLOAD)
+                    
+                    for lang, lang_list in additional_languages.items():
+                        try:
+                            self.additional_readers[lang] = create_reader(lang_list)
+                            self.additional_reader_langs[lang] = lang_list
+                        except Exception:
+                            pass
                 
-                lang_count = len(self.additional_readers) + 2
+                lang_count = len(self.additional_reader_langs) + 2
                 self.update_status(f"Готов к работе ({lang_count} языков OCR)", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
                 
             except Exception as e:
@@ -373,7 +454,80 @@ class ScreenTranslator:
         self.status_text.color = color
         self.status_icon.name = icon
         self.status_icon.color = color
-        self.page.update()
+        self.ui.request_update()
+        
+    def grab_screen(self, bbox=None):
+        """Кадр экрана для OCR: BGR-массив (в режиме экономии памяти — серый) без промежуточных файлов"""
+        with self.capture_lock:
+            if self.capture_backend is None:
+                self.capture_backend = get_capture_backend()
+            try:
+                frame = self.capture_backend.grab_array(bbox)
+            except OSError:
+                # Бэкенд перестал работать (например, после смены дисплея) — переходим на ImageGrab
+                self.capture_backend.close()
+                self.capture_backend = ImageGrabBackend()
+                frame = self.capture_backend.grab_array(bbox)
+            
+            # Единственная копия кадра: преобразование из переиспользуемого буфера захвата
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY if LOW_MEMORY_MODE else cv2.COLOR_BGRA2BGR)
+            if LOW_MEMORY_MODE:
+                self.capture_backend.release_buffers()
+        return frame
+        
+    def use_frame(self, frame, preview_path, source):
+        """Кадр уходит в OCR из памяти; на диск пишется только миниатюра для превью"""
+        height, width = frame.shape[:2]
+        scale = min(1.0, 800 / width, 160 / height)
+        preview = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if preview.ndim == 3:
+            preview = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+        Image.fromarray(preview).save(preview_path, compress_level=1)
+        
+        self.set_current_image(preview_path, source=source, frame=frame)
+        self.show_image_preview(preview_path)
+        
+    def refresh_memory_panel(self):
+        if LOW_MEMORY_MODE:
+            self.unload_idle_models()
+        
+        with self.models_lock:
+            readers = [reader for reader in [self.reader] + list(self.additional_readers.values()) if reader is not None]
+        
+        capture_buffer = getattr(self.capture_backend, 'buffer', None)
+        frames = self.frame_bytes + (capture_buffer.nbytes if capture_buffer is not None else 0)
+        
+        snapshot = memory_snapshot(models_nbytes(readers), frames, self.preview_bytes)
+        self.memory_text.value = ("🪶 " if LOW_MEMORY_MODE else "") + format_snapshot(snapshot)
+        self.ui.request_update()
+        
+    def unload_idle_models(self):
+        with self.models_lock:
+            if self.active_jobs or self.reader_langs is None:
+                return
+            if self.reader is None and not self.additional_readers:
+                return
+            if time.monotonic() - self.last_ocr_time < IDLE_MODEL_TIMEOUT:
+                return
+            
+            self.reader = None
+            self.additional_readers = {}
+            release_shared_detector()
+        
+        release_memory()
+        self.update_status("Модели OCR выгружены из памяти до следующего распознавания", ft.Colors.BLUE_400, ft.Icons.MEMORY)
+        
+    def begin_ocr_job(self):
+        with self.models_lock:
+            self.active_jobs += 1
+            
+    def end_ocr_job(self):
+        with self.models_lock:
+            self.active_jobs -= 1
+            self.last_ocr_time = time.monotonic()
+        self.frame_bytes = 0
+        if LOW_MEMORY_MODE:
+            release_memory()
         
     def select_screen_area(self, e):
         self.update_status("🎯 Выделите область экрана...", ft.Colors.ORANGE_400, ft.Icons.CROP_FREE)
@@ -382,7 +536,6 @@ class ScreenTranslator:
             try:
                 area_script = '''# -*- coding: utf-8 -*-
 import tkinter as tk
-from PIL import Image, ImageGrab
 import sys
 import os
 
@@ -439,7 +592,7 @@ class AreaSelector:
             
             if abs(x2 - x1) > 10 and abs(y2 - y1) > 10:
                 self.root.destroy()
-                self.capture_area(x1, y1, x2 - x1, y2 - y1)
+                print(f"AREA {x1} {y1} {x2} {y2}")
             else:
                 self.cancel()
                 
@@ -447,15 +600,6 @@ class AreaSelector:
         self.root.destroy()
         sys.exit(1)
         
-    def capture_area(self, x, y, width, height):
-        try:
-            screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
-            screenshot.save("temp_area_screenshot.png")
-            print("SUCCESS")
-        except Exception as e:
-            print("ERROR: " + str(e))
-            sys.exit(1)
-
 if __name__ == "__main__":
     AreaSelector()
 '''
@@ -470,13 +614,12 @@ if __name__ == "__main__":
                 
                 os.unlink(script_path)
                 
-                if result.returncode == 0 and "SUCCESS" in result.stdout:
-                    if os.path.exists("temp_area_screenshot.png"):
-                        self.current_image_path = "temp_area_screenshot.png"
-                        self.show_image_preview("temp_area_screenshot.png")
-                        self.update_status("Область экрана захвачена", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
-                    else:
-                        self.update_status("Файл скриншота не найден", ft.Colors.RED_400, ft.Icons.ERROR)
+                area_lines = [line for line in result.stdout.splitlines() if line.startswith("AREA ")]
+                
+                if result.returncode == 0 and area_lines:
+                    bbox = tuple(int(value) for value in area_lines[-1].split()[1:5])
+                    self.use_frame(self.grab_screen(bbox), "temp_area_screenshot.png", "area")
+                    self.update_status("Область экрана захвачена", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
                 else:
                     self.update_status("Выбор области отменен", ft.Colors.ORANGE_400, ft.Icons.CANCEL)
                     
@@ -492,12 +635,7 @@ if __name__ == "__main__":
         
         def capture():
             try:
-                screenshot = ImageGrab.grab()
-                screenshot_path = "temp_fullscreen.png"
-                screenshot.save(screenshot_path)
-                
-                self.current_image_path = screenshot_path
-                self.show_image_preview(screenshot_path)
+                self.use_frame(self.grab_screen(), "temp_fullscreen.png", "fullscreen")
                 self.update_status("Скриншот экрана создан", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
                 
             except Exception as e:
@@ -516,17 +654,13 @@ if __name__ == "__main__":
                 
                 if clipboard_image is not None:
                     if isinstance(clipboard_image, Image.Image):
-                        clipboard_path = "temp_clipboard.png"
-                        clipboard_image.save(clipboard_path)
-                        
-                        self.current_image_path = clipboard_path
-                        self.show_image_preview(clipboard_path)
+                        self.use_frame(self.decode_image(clipboard_image), "temp_clipboard.png", "clipboard")
                         self.update_status("Изображение получено из буфера обмена", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
                     elif isinstance(clipboard_image, list):
                         if len(clipboard_image) > 0:
                             file_path = clipboard_image[0]
-                            if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')):
-                                self.current_image_path = file_path
+                            if file_path.lower().endswith(IMAGE_EXTENSIONS):
+                                self.set_current_image(file_path)
                                 self.show_image_preview(file_path)
                                 self.update_status("Файл изображения получен из буфера обмена", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
                             else:
@@ -542,7 +676,7 @@ if __name__ == "__main__":
                         bgcolor=ft.Colors.ORANGE_600
                     )
                     self.page.snack_bar.open = True
-                    self.page.update()
+                    self.ui.request_update()
                     
             except Exception as e:
                 self.update_status(f"Ошибка получения из буфера: {str(e)}", ft.Colors.RED_400, ft.Icons.ERROR)
@@ -554,48 +688,62 @@ if __name__ == "__main__":
     def capture_fullscreen(self, e):
         self.update_status("Создание скриншота экрана...", ft.Colors.ORANGE_400, ft.Icons.CAMERA_ALT)
         try:
-            screenshot = ImageGrab.grab()
-            screenshot_path = "temp_fullscreen.png"
-            screenshot.save(screenshot_path)
-            
-            self.current_image_path = screenshot_path
-            self.show_image_preview(screenshot_path)
+            self.use_frame(self.grab_screen(), "temp_fullscreen.png", "fullscreen")
             self.update_status("Скриншот экрана создан", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
             
         except Exception as e:
             self.update_status(f"Ошибка создания скриншота: {str(e)}", ft.Colors.RED_400, ft.Icons.ERROR)
             
+    def set_current_image(self, image_path, image_paths=None, source="file", frame=None):
+        self.current_image_path = image_path
+        self.current_image_paths = image_paths or [image_path]
+        self.current_source = source
+        self.current_frame = frame
+        
     def choose_file(self, e):
         def file_picker_result(e: ft.FilePickerResultEvent):
             if e.files:
-                file_path = e.files[0].path
-                self.current_image_path = file_path
-                self.show_image_preview(file_path)
-                self.update_status(f"Выбран файл: {os.path.basename(file_path)}", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
+                file_paths = [f.path for f in e.files]
+                self.set_current_image(file_paths[0], file_paths)
+                self.show_image_preview(file_paths[0])
+                if len(file_paths) > 1:
+                    self.update_status(f"Выбрано файлов: {len(file_paths)}", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
+                else:
+                    self.update_status(f"Выбран файл: {os.path.basename(file_paths[0])}", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
         
         file_picker = ft.FilePicker(on_result=file_picker_result)
         self.page.overlay.append(file_picker)
         self.page.update()
         
         file_picker.pick_files(
-            dialog_title="Выберите изображение",
-            allowed_extensions=["png", "jpg", "jpeg", "bmp", "tiff", "gif"]
+            dialog_title="Выберите изображения",
+            allowed_extensions=["png", "jpg", "jpeg", "bmp", "tiff", "tif", "gif"],
+            allow_multiple=True
         )
         
+    def render_preview(self, image_path, max_width=400, max_height=80):
+        """Быстрая миниатюра в памяти: draft/reduce при декодировании, без временных файлов"""
+        with Image.open(image_path) as image:
+            image.draft('RGB', (max_width * 2, max_height * 2))
+            image.thumbnail((max_width, max_height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+            if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                image = image.convert('RGB')
+            
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG', compress_level=1)
+            return base64.b64encode(buffer.getvalue()).decode('ascii'), image.width, image.height
+        
     def show_image_preview(self, image_path):
         try:
-            image = Image.open(image_path)
             max_width, max_height = 400, 80
-            image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            
-            preview_path = "temp_preview.png"
-            image.save(preview_path)
+            preview_base64, width, height = self.render_preview(image_path, max_width, max_height)
+            self.preview_bytes = len(preview_base64)
             
             self.image_preview.content = ft.Column([
                 ft.Image(
-                    src=preview_path,
-                    width=min(image.width, max_width),
-                    height=min(image.height, max_height),
+                    src_base64=preview_base64,
+                    width=min(width, max_width),
+                    height=min(height, max_height),
                     fit=ft.ImageFit.CONTAIN,
                     border_radius=10
                 ),
@@ -612,95 +760,301 @@ if __name__ == "__main__":
                     text_align=ft.TextAlign.CENTER
                 )
             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=10)
-            self.page.update()
+            self.ui.request_update()
             
         except Exception as e:
             self.update_status(f"Ошибка загрузки изображения: {str(e)}", ft.Colors.RED_400, ft.Icons.ERROR)
             
-    def advanced_preprocess_image(self, image_path):
-        """Улучшенная предобработка изображения для лучшего OCR"""
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                raise Exception("Не удалось загрузить изображение")
-            
-            height, width = img.shape[:2]
-            if width < 800:
-                scale_factor = 800 / width
-                new_width = int(width * scale_factor)
-                new_height = int(height * scale_factor)
-                img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
+    def recognize_adaptive(self, reader, image, source=None, tried=None, original=None):
+        """Распознавание BGR- или серого массива с выбором предобработки по статистике изображения.
+        
+        Варианты перебираются в порядке, который предлагает preprocess_selector, пока
+        результат не станет уверенным или не кончатся попытки; победитель запоминается.
+        Уже выполненные проходы (tried) входят в лимит попыток. Если все проходы слабые,
+        тратится еще один на вариант, который реже всего запускался, — иначе варианты
+        из хвоста порядка никогда не получили бы шанса выиграть. Для варианта 'original'
+        в OCR передается original (например, путь к файлу), а без него — сам массив.
+        """
+        source = source or self.current_source
+        candidates = dict(tried or {})
+        ran = []
+        
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        stats = image_stats(gray)
+        preprocess = apply_variant_strips if LOW_MEMORY_MODE else apply_variant
+        scaled_gray = None
+        
+        def confident(variant):
+            return any(result[2] > 0.6 for result in candidates.get(variant, []))
+        
+        def run(variant):
+            nonlocal scaled_gray
+            if variant == 'original':
+                candidates[variant] = reader.readtext(image if original is None else original)
+            else:
+                if scaled_gray is None:
+                    scaled_gray = upscale(gray)
+                candidates[variant] = reader.readtext(preprocess(variant, scaled_gray))
+            ran.append(variant)
+        
+        order = self.preprocess_selector.order(source, stats)
+        for variant in order:
+            if confident(variant):
+                break
+            if variant in candidates:
+                continue
+            if len(candidates) >= MAX_PREPROCESS_ATTEMPTS:
+                break
             
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            run(variant)
+            if confident(variant):
+                break
+        
+        if not any(confident(variant) for variant in candidates):
+            variant = self.preprocess_selector.explore(source, stats, [v for v in order if v not in candidates])
+            if variant is not None:
+                run(variant)
+        
+        if not candidates:
+            return []
+        
+        best_variant = max(candidates, key=lambda variant: confidence_score(candidates[variant]))
+        self.preprocess_selector.record(
+            source, stats, best_variant if candidates[best_variant] else None, list(tried or {}) + ran
+        )
+        
+        return candidates[best_variant]
+        
+    def get_reader(self):
+        """Ридер для выбранного языка; выгруженные или отложенные модели загружаются здесь"""
+        source_lang = self.source_lang.value
+        
+        with self.models_lock:
+            if self.reader is None and self.reader_langs:
+                self.reader = create_reader(self.reader_langs)
             
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(gray)
+            if source_lang in self.additional_reader_langs and source_lang not in self.additional_readers:
+                try:
+                    self.additional_readers[source_lang] = create_reader(self.additional_reader_langs[source_lang])
+                except Exception:
+                    self.additional_reader_langs.pop(source_lang)
             
-            denoised = cv2.medianBlur(enhanced, 3)
+            if source_lang in self.additional_readers:
+                return self.additional_readers[source_lang]
+            return self.reader
             
-            _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    def decode_image(self, image):
+        """Массив для OCR в порядке каналов BGR, как его ждет easyocr; в режиме экономии памяти — серый"""
+        if LOW_MEMORY_MODE:
+            image.draft('L', image.size)
+            return np.array(image.convert('L'))
+        return cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+        
+    def extract_text(self, image_path, frame=None):
+        """Распознавание файла или уже декодированного кадра (захват экрана, буфер обмена)"""
+        try:
+            reader = self.get_reader()
             
-            processed_path = "temp_processed_simple.png"
-            cv2.imwrite(processed_path, binary)
+            if frame is None:
+                with Image.open(image_path) as image:
+                    pixels = self.decode_image(image)
+                # Файл сам по себе — самый точный вход для прохода без предобработки
+                original = None if LOW_MEMORY_MODE else image_path
+            else:
+                pixels = frame
+                original = None
+            self.frame_bytes = pixels.nbytes
             
-            return processed_path
+            results = self.recognize_adaptive(reader, pixels, original=original)
             
+            return self.format_results(results)
+                
         except Exception as e:
-            raise Exception(f"Ошибка предобработки изображения: {str(e)}")
-            
-    def extract_text(self, image_path):
-        try:
-            source_lang = self.source_lang.value
+            raise Exception(f"Ошибка извлечения текста: {str(e)}")
             
-            if source_lang in self.additional_readers:
-                results_raw = self.additional_readers[source_lang].readtext(image_path)
-            else:
-                results_raw = self.reader.readtext(image_path)
+    def format_results(self, results):
+        """Сортировка, фильтрация по уверенности и очистка результатов OCR"""
+        if results:
+            results.sort(key=lambda x: (x[0][0][1], x[0][0][0]))
             
-            if results_raw and any(result[2] > 0.6 for result in results_raw):
-                results = results_raw
-            else:
-                processed_path = self.advanced_preprocess_image(image_path)
+            filtered_results = []
+            for result in results:
+                text = result[1].strip()
+                confidence = result[2]
                 
-                if source_lang in self.additional_readers:
-                    results = self.additional_readers[source_lang].readtext(processed_path)
-                else:
-                    results = self.reader.readtext(processed_path)
+                if len(text) < 1:
+                    continue
                 
-                if os.path.exists(processed_path):
-                    os.remove(processed_path)
+                min_confidence = 0.2 if len(text) > 2 else 0.4
                 
-                if not results or not any(result[2] > 0.3 for result in results):
-                    results = results_raw
+                if confidence > min_confidence:
+                    filtered_results.append(text)
+            
+            if filtered_results:
+                extracted_text = ' '.join(filtered_results)
+                extracted_text = ' '.join(extracted_text.split())
+                extracted_text = extracted_text.replace(' | ', ' ')
+                extracted_text = extracted_text.replace('|', 'l')
                 
-            if results:
-                results.sort(key=lambda x: (x[0][0][1], x[0][0][0]))
+                return extracted_text.strip()
                 
-                filtered_results = []
-                for result in results:
-                    text = result[1].strip()
-                    confidence = result[2]
-                    
-                    if len(text) < 1:
-                        continue
-                    
-                    min_confidence = 0.2 if len(text) > 2 else 0.4
-                    
-                    if confidence > min_confidence:
-                        filtered_results.append(text)
-                
-                if filtered_results:
-                    extracted_text = ' '.join(filtered_results)
-                    extracted_text = ' '.join(extracted_text.split())
-                    extracted_text = extracted_text.replace(' | ', ' ')
-                    extracted_text = extracted_text.replace('|', 'l')
-                    
-                    return extracted_text.strip()
+        return ""
+        
+    def count_frames(self, image_path):
+        try:
+            with Image.open(image_path) as image:
+                return getattr(image, 'n_frames', 1)
+        except Exception:
+            return 1
+            
+    def iter_frames(self, image_paths):
+        """Ленивое декодирование кадров/страниц: (подпись, массив) по одному"""
+        for image_path in image_paths:
+            with Image.open(image_path) as image:
+                n_frames = getattr(image, 'n_frames', 1)
+                name = os.path.basename(image_path)
+                for index, frame in enumerate(ImageSequence.Iterator(image)):
+                    label = name if n_frames == 1 else f"{name} [{index + 1}/{n_frames}]"
+                    yield label, self.decode_image(frame)
                     
-            return ""
+    def iter_frame_batches(self, frames, batch_size=OCR_BATCH_SIZE):
+        """Группировка кадров одинакового размера в пакеты для readtext_batched"""
+        batch = []
+        for label, frame in frames:
+            if batch and (len(batch) == batch_size or batch[0][1].shape != frame.shape):
+                yield batch
+                batch = []
+            batch.append((label, frame))
+        
+        if batch:
+            yield batch
+            
+    def extract_pages(self, image_paths):
+        """Пакетное распознавание всех страниц; выдает (подпись, текст) по мере готовности"""
+        reader = self.get_reader()
+        # В режиме экономии памяти readtext_batched не склеивает несколько страниц в один массив
+        batch_size = 1 if LOW_MEMORY_MODE else OCR_BATCH_SIZE
+        
+        for batch in self.iter_frame_batches(self.iter_frames(image_paths), batch_size):
+            frames = [frame for _, frame in batch]
+            self.frame_bytes = sum(frame.nbytes for frame in frames)
+            batch_results = reader.readtext_batched(frames, batch_size=len(frames))
+            
+            for (label, frame), results in zip(batch, batch_results):
+                if not results or not any(result[2] > 0.6 for result in results):
+                    results = self.recognize_adaptive(reader, frame, tried={'original': list(results)})
                 
-        except Exception as e:
-            raise Exception(f"Ошибка извлечения текста: {str(e)}")
+                yield label, self.format_results(list(results))
+            
+            del frames, batch_results
+            
+    def create_translator(self):
+        if TRANSLATE_SERVICE_URLS:
+            return Translator(service_urls=TRANSLATE_SERVICE_URLS)
+        return Translator()
+        
+    def _translate_request(self, translator, text, source_lang, target_lang):
+        if source_lang == "auto":
+            return translator.translate(text, dest=target_lang)
+        return translator.translate(text, src=source_lang, dest=target_lang)
+        
+    def _translate_segment(self, segment, source_lang, target_lang):
+        """Перевод одного сегмента с повторными попытками"""
+        for attempt in range(3):
+            try:
+                result = self._translate_request(self.create_translator(), segment, source_lang, target_lang)
+                if result and hasattr(result, 'text') and result.text:
+                    return result.text
+                raise Exception("Пустой результат перевода")
+            except Exception:
+                if attempt == 2:
+                    return f"[Ошибка перевода] {segment}"
+                time.sleep(1)
+                
+    def pack_segments(self, segments, max_chars=BATCH_MAX_CHARS):
+        """Группировка сегментов в пакеты, не превышающие max_chars символов"""
+        batches = []
+        current = []
+        current_len = 0
+        
+        for index, segment in enumerate(segments):
+            segment_len = len(segment) + len(BATCH_DELIMITER)
+            if current and current_len + segment_len > max_chars:
+                batches.append(current)
+                current = []
+                current_len = 0
+            current.append(index)
+            current_len += segment_len
+        
+        if current:
+            batches.append(current)
+            
+        return batches
+        
+    def translate_batch(self, segments, source_lang, target_lang, translator=None):
+        """Пакетный перевод сегментов минимальным числом запросов.
+        
+        Сегменты объединяются маркером BATCH_DELIMITER, ответ разбивается обратно.
+        Если число частей в ответе не совпало, пакет переводится по сегментам; после
+        BATCH_MAX_MISMATCHES таких промахов подряд пакетирование отключается до перезапуска.
+        Ошибки запроса пробрасываются вызывающему, который решает, повторять ли попытку.
+        """
+        translator = translator or self.create_translator()
+        translated = list(segments)
+        marker = BATCH_DELIMITER.strip()
+        
+        pending = [i for i, segment in enumerate(segments) if segment.strip()]
+        cleaned = [' '.join(segments[i].split()) for i in pending]
+        
+        for batch in self.pack_segments(cleaned):
+            batch_segments = [cleaned[i] for i in batch]
+            parts = None
+            
+            if self.batch_mismatches < BATCH_MAX_MISMATCHES and not any(marker in segment for segment in batch_segments):
+                result = self._translate_request(translator, BATCH_DELIMITER.join(batch_segments), source_lang, target_lang)
+                if not (result and hasattr(result, 'text') and result.text):
+                    raise Exception("Пустой результат перевода")
+            
+                parts = [part.strip() for part in result.text.split(marker)]
+                if len(parts) == len(batch_segments) and all(parts):
+                    self.batch_mismatches = 0
+                else:
+                    self.batch_mismatches += 1
+                    parts = None
+            
+            if parts is None:
+                parts = [self._translate_segment(segment, source_lang, target_lang) for segment in batch_segments]
+            
+            for i, part in zip(batch, parts):
+                translated[pending[i]] = part
+                
+        return translated
+            
+    def translate_segments(self, segments, source_lang, target_lang):
+        """Перевод нескольких текстов (например, страниц) общими пакетами с повторными попытками.
+        
+        Тексты длиннее BATCH_MAX_CHARS переводятся отдельно через translate_text.
+        """
+        translated = [
+            self.translate_text(segment, source_lang, target_lang) if len(segment) > BATCH_MAX_CHARS else segment
+            for segment in segments
+        ]
+        short = [i for i, segment in enumerate(segments) if len(segment) <= BATCH_MAX_CHARS]
+        
+        for attempt in range(3):
+            try:
+                parts = self.translate_batch([segments[i] for i in short], source_lang, target_lang)
+                break
+            except Exception:
+                if attempt == 2:
+                    parts = [f"[Ошибка перевода] {segments[i]}" if segments[i].strip() else segments[i] for i in short]
+                else:
+                    time.sleep(1)
+        
+        for i, part in zip(short, parts):
+            translated[i] = part
+            
+        return translated
             
     def translate_text(self, text, source_lang, target_lang):
         """Улучшенный перевод текста с обработкой ошибок"""
@@ -710,12 +1064,12 @@ if __name__ == "__main__":
             
             for attempt in range(3):
                 try:
-                    translator = Translator()
+                    translator = self.create_translator()
                     
                     max_length = 500
                     if len(text) > max_length:
                         sentences = text.split('. ')
-                        translated_parts = []
+                        chunks = []
                         current_part = ""
                         
                         for sentence in sentences:
@@ -723,35 +1077,15 @@ if __name__ == "__main__":
                                 current_part += sentence + ". "
                             else:
                                 if current_part:
-                                    if source_lang == "auto":
-                                        result = translator.translate(current_part.strip(), dest=target_lang)
-                                    else:
-                                        result = translator.translate(current_part.strip(), src=source_lang, dest=target_lang)
-                                    
-                                    if result and hasattr(result, 'text') and result.text:
-                                        translated_parts.append(result.text)
-                                    else:
-                                        translated_parts.append(current_part.strip())
-                                        
+                                    chunks.append(current_part.strip())
                                 current_part = sentence + ". "
                         
                         if current_part:
-                            if source_lang == "auto":
-                                result = translator.translate(current_part.strip(), dest=target_lang)
-                            else:
-                                result = translator.translate(current_part.strip(), src=source_lang, dest=target_lang)
-                            
-                            if result and hasattr(result, 'text') and result.text:
-                                translated_parts.append(result.text)
-                            else:
-                                translated_parts.append(current_part.strip())
+                            chunks.append(current_part.strip())
                         
-                        return ' '.join(translated_parts)
+                        return ' '.join(self.translate_batch(chunks, source_lang, target_lang, translator))
                     else:
-                        if source_lang == "auto":
-                            result = translator.translate(text, dest=target_lang)
-                        else:
-                            result = translator.translate(text, src=source_lang, dest=target_lang)
+                        result = self._translate_request(translator, text, source_lang, target_lang)
                         
                         if result and hasattr(result, 'text') and result.text:
                             return result.text
@@ -775,16 +1109,16 @@ if __name__ == "__main__":
                 bgcolor=ft.Colors.ORANGE_600
             )
             self.page.snack_bar.open = True
-            self.page.update()
+            self.ui.request_update()
             return
             
-        if not self.reader:
+        if not self.reader and not self.reader_langs:
             self.page.snack_bar = ft.SnackBar(
                 content=ft.Text("OCR не инициализирован. Подождите завершения загрузки."),
                 bgcolor=ft.Colors.RED_600
             )
             self.page.snack_bar.open = True
-            self.page.update()
+            self.ui.request_update()
             return
             
         if not self.translator:
@@ -793,26 +1127,56 @@ if __name__ == "__main__":
                 bgcolor=ft.Colors.ORANGE_600
             )
             self.page.snack_bar.open = True
-            self.page.update()
+            self.ui.request_update()
+            
+        def process_pages(image_paths):
+            source_lang = self.source_lang.value
+            target_lang = self.target_lang.value
+            labels = []
+            page_texts = []
+            original_parts = []
+            
+            for label, extracted_text in self.extract_pages(image_paths):
+                labels.append(label)
+                page_texts.append(extracted_text)
+                original_parts.append(f"— {label} —\n{extracted_text or 'Текст не обнаружен'}")
+                
+                self.original_text.value = "\n\n".join(original_parts)
+                self.update_status(f"Распознано страниц: {len(original_parts)}", ft.Colors.ORANGE_400, ft.Icons.SEARCH)
+            
+            # Страницы переводятся вместе: короткие укладываются в общие пакетные запросы
+            self.update_status("Перевод текста...", ft.Colors.ORANGE_400, ft.Icons.TRANSLATE)
+            translated_pages = self.translate_segments(page_texts, source_lang, target_lang)
+            self.translated_text.value = "\n\n".join(
+                f"— {label} —\n{translated}" for label, translated in zip(labels, translated_pages)
+            )
+            
+            self.update_status(f"Готово! Обработано страниц: {len(labels)}", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
             
         def process():
+            self.begin_ocr_job()
             try:
                 self.update_status("Распознавание текста...", ft.Colors.ORANGE_400, ft.Icons.SEARCH)
                 
                 self.original_text.value = ""
                 self.translated_text.value = ""
-                self.page.update()
+                self.ui.request_update()
+                
+                image_paths = self.current_image_paths
+                if self.current_frame is None and (len(image_paths) > 1 or self.count_frames(image_paths[0]) > 1):
+                    process_pages(image_paths)
+                    return
                 
-                extracted_text = self.extract_text(self.current_image_path)
+                extracted_text = self.extract_text(self.current_image_path, self.current_frame)
                 
                 if not extracted_text:
                     self.update_status("Текст не найден на изображении", ft.Colors.RED_400, ft.Icons.ERROR)
                     self.original_text.value = "Текст не обнаружен на изображении\n\n💡 Советы:\n• Убедитесь, что текст четкий и достаточно крупный\n• Попробуйте выбрать конкретный язык вместо 'auto'\n• Проверьте качество изображения"
-                    self.page.update()
+                    self.ui.request_update()
                     return
                     
                 self.original_text.value = extracted_text
-                self.page.update()
+                self.ui.request_update()
                 
                 self.update_status("Перевод текста...", ft.Colors.ORANGE_400, ft.Icons.TRANSLATE)
                 source_lang = self.source_lang.value
@@ -820,13 +1184,15 @@ if __name__ == "__main__":
                 
                 translated = self.translate_text(extracted_text, source_lang, target_lang)
                 self.translated_text.value = translated
-                self.page.update()
+                self.ui.request_update()
                 
                 self.update_status("Готово! Текст успешно распознан и переведен", ft.Colors.GREEN_400, ft.Icons.CHECK_CIRCLE)
                 
             except Exception as e:
                 error_msg = str(e)
                 self.update_status(f"Ошибка: {error_msg}", ft.Colors.RED_400, ft.Icons.ERROR)
+            finally:
+                self.end_ocr_job()
                 
         thread = threading.Thread(target=process)
         thread.daemon = True
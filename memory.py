@@ -0,0 +1,126 @@
+"""Режим экономии памяти и учет потребления для панели памяти."""
+import ctypes
+import ctypes.util
+import gc
+import os
+import sys
+import threading
+import weakref
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LOW_MEMORY_MODE = os.environ.get('OCR_LOW_MEMORY', '').lower() in ('1', 'true', 'yes', 'on')
+LOW_MEMORY_THREADS = 2
+IDLE_MODEL_TIMEOUT = float(os.environ.get('OCR_IDLE_MODEL_TIMEOUT', 300))
+M_ARENA_MAX = -8
+
+def _libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return ctypes.CDLL(ctypes.util.find_library('c'))
+    except OSError:
+        return None
+
+def configure_low_memory():
+    """Ограничение потоков torch и арен malloc; вызывать до первого распознавания"""
+    import torch
+
+    torch.set_num_threads(LOW_MEMORY_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    libc = _libc()
+    if libc is not None:
+        try:
+            libc.mallopt(M_ARENA_MAX, LOW_MEMORY_THREADS)
+        except AttributeError:
+            pass
+
+def release_memory():
+    """Сборка мусора и возврат освобожденной кучи ОС"""
+    gc.collect()
+    libc = _libc()
+    if libc is not None:
+        try:
+            libc.malloc_trim(0)
+        except AttributeError:
+            pass
+
+def process_rss():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _value_nbytes(value):
+    if hasattr(value, 'element_size') and hasattr(value, 'nelement'):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (tuple, list)):
+        return sum(_value_nbytes(item) for item in value)
+    return 0
+
+_module_sizes = weakref.WeakKeyDictionary()
+
+def module_nbytes(module):
+    if module not in _module_sizes:
+        _module_sizes[module] = sum(_value_nbytes(value) for value in module.state_dict().values())
+    return _module_sizes[module]
+
+def models_nbytes(readers):
+    """Объем весов уникальных сетей (общий детектор считается один раз)"""
+    seen = set()
+    total = 0
+    for reader in readers:
+        for module in (getattr(reader, 'detector', None), getattr(reader, 'recognizer', None)):
+            if module is None or id(module) in seen:
+                continue
+            seen.add(id(module))
+            total += module_nbytes(module)
+    return total
+
+def memory_snapshot(models=0, frames=0, caches=0):
+    rss = process_rss()
+    return {
+        'rss': rss,
+        'models': models,
+        'frames': frames,
+        'caches': caches,
+        'other': max(0, rss - models - frames - caches),
+    }
+
+def format_snapshot(snapshot):
+    mb = lambda value: f"{value / (1 << 20):.0f} МБ"
+    return (f"RSS {mb(snapshot['rss'])} · модели {mb(snapshot['models'])} · "
+            f"кадры {mb(snapshot['frames'])} · кэши {mb(snapshot['caches'])} · прочее {mb(snapshot['other'])}")
+
+class MemoryMonitor:
+    """Фоновый опрос памяти с заданным интервалом"""
+
+    def __init__(self, callback, interval=2.0):
+        self.callback = callback
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.callback()
+            except Exception:
+                pass
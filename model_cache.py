@@ -0,0 +1,164 @@
+"""Кэш «теплого старта» для моделей EasyOCR.
+
+После первой (холодной) инициализации готовые сети — уже собранные и квантованные —
+сохраняются целиком. Следующие запуски отображают веса в память (mmap) вместо повторной
+сборки, проверки md5 и квантования. Детектор CRAFT общий для всех наборов языков: один
+файл на диске и один экземпляр модели в процессе.
+
+Файлы кэша — pickle целых модулей, загрузка выполняет код из них. Контрольная сумма
+защищает только от порчи, поэтому каталог кэша должен принадлежать текущему
+пользователю и быть закрыт от записи для остальных: иначе кэш не читается и не пишется.
+"""
+import hashlib
+import json
+import os
+import threading
+import easyocr
+import torch
+from easyocr.detection import get_detector, get_textbox
+
+CACHE_DIR = os.environ.get('OCR_MODEL_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.EasyOCR', 'warm_cache')
+CACHE_FORMAT = 1
+DETECT_NETWORK = 'craft'
+
+_loaded_detectors = {}
+_detectors_lock = threading.Lock()
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _versions():
+    return f"easyocr{easyocr.__version__}-torch{torch.__version__.split('+')[0]}-v{CACHE_FORMAT}"
+
+def _detector_path(detect_network):
+    return os.path.join(CACHE_DIR, f"detector-{detect_network}-{_versions()}.pt")
+
+def _recognizer_path(lang_list):
+    return os.path.join(CACHE_DIR, f"recognizer-{'_'.join(lang_list)}-{_versions()}.pt")
+
+def _manifest_path(path):
+    return path + '.json'
+
+def _is_private(path):
+    """Файл или каталог принадлежит текущему пользователю и недоступен другим на запись"""
+    if not hasattr(os, 'getuid'):
+        # Windows: доступ определяется ACL профиля пользователя
+        return True
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+def _write_atomic(obj, path):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(obj, temp_path)
+    os.chmod(temp_path, 0o600)
+    os.replace(temp_path, path)
+
+    manifest = {
+        'versions': _versions(),
+        'size': os.path.getsize(path),
+        'sha256': file_sha256(path),
+    }
+    temp_manifest = f"{_manifest_path(path)}.{os.getpid()}.tmp"
+    with open(temp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.chmod(temp_manifest, 0o600)
+    os.replace(temp_manifest, _manifest_path(path))
+
+def _read_manifest(path):
+    try:
+        with open(_manifest_path(path), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('versions') != _versions() or not os.path.isfile(path):
+        return None
+    return manifest
+
+def _load_verified(path):
+    """Загрузка файла кэша через mmap, только из закрытого каталога и по контрольной сумме"""
+    if not all(_is_private(item) for item in (CACHE_DIR, path, _manifest_path(path))):
+        return None
+
+    manifest = _read_manifest(path)
+    if manifest is None:
+        return None
+    if os.path.getsize(path) != manifest.get('size') or file_sha256(path) != manifest.get('sha256'):
+        return None
+
+    try:
+        return torch.load(path, map_location='cpu', mmap=True, weights_only=False)
+    except TypeError:
+        # torch < 2.1 не умеет mmap
+        return torch.load(path, map_location='cpu')
+
+def _shared_detector(detector=None):
+    """Один экземпляр детектора на процесс: из памяти, из кэша или переданный"""
+    with _detectors_lock:
+        if DETECT_NETWORK not in _loaded_detectors:
+            if detector is None:
+                detector = _load_verified(_detector_path(DETECT_NETWORK))
+                if detector is None:
+                    return None
+                detector.eval()
+            _loaded_detectors[DETECT_NETWORK] = detector
+        return _loaded_detectors[DETECT_NETWORK]
+
+def release_shared_detector():
+    """Забыть общий детектор, чтобы его память освободилась вместе с ридерами"""
+    with _detectors_lock:
+        _loaded_detectors.clear()
+
+def load_warm_reader(lang_list):
+    """Reader с сетями из кэша или None, если кэш отсутствует или поврежден"""
+    recognizer_state = _load_verified(_recognizer_path(lang_list))
+    if recognizer_state is None:
+        return None
+
+    detector = _shared_detector()
+    if detector is None:
+        return None
+
+    reader = easyocr.Reader(lang_list, gpu=False, verbose=False, detector=False, recognizer=False)
+    reader.detect_network = DETECT_NETWORK
+    reader.get_detector, reader.get_textbox = get_detector, get_textbox
+    reader.detector = detector
+    reader.recognizer = recognizer_state['recognizer'].eval()
+    reader.converter = recognizer_state['converter']
+    return reader
+
+def save_warm_reader(reader, lang_list):
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    if not _is_private(CACHE_DIR):
+        return
+
+    detector_path = _detector_path(DETECT_NETWORK)
+    if _read_manifest(detector_path) is None:
+        _write_atomic(reader.detector, detector_path)
+
+    _write_atomic({'recognizer': reader.recognizer, 'converter': reader.converter}, _recognizer_path(lang_list))
+
+def create_reader(lang_list):
+    """CPU-ридер EasyOCR: теплый старт из кэша, иначе обычная инициализация с сохранением в кэш"""
+    try:
+        reader = load_warm_reader(lang_list)
+        if reader is not None:
+            return reader
+    except Exception:
+        pass
+
+    reader = easyocr.Reader(lang_list, gpu=False, verbose=False, detect_network=DETECT_NETWORK)
+
+    try:
+        save_warm_reader(reader, lang_list)
+    except Exception:
+        pass
+
+    reader.detector = _shared_detector(reader.detector)
+    return reader
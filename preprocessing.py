@@ -0,0 +1,211 @@
+import threading
+import cv2
+import numpy as np
+
+MIN_OCR_WIDTH = 800
+STRIP_HEIGHT = 512
+STRIP_OVERLAP = 16
+CLAHE_TILES = 8
+# Медиана 3x3 + adaptiveThreshold 31x31 и гауссово размытие sigma=1 укладываются в перекрытие
+LOCAL_VARIANTS = ('adaptive', 'sharpen')
+
+def upscale(img, min_width=MIN_OCR_WIDTH):
+    height, width = img.shape[:2]
+    if width >= min_width:
+        return img
+    scale_factor = min_width / width
+    return cv2.resize(img, (int(width * scale_factor), int(height * scale_factor)), interpolation=cv2.INTER_CUBIC)
+
+def clahe(gray, tiles_y=CLAHE_TILES):
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(CLAHE_TILES, tiles_y)).apply(gray)
+
+def median(gray):
+    return cv2.medianBlur(gray, 3)
+
+def otsu(gray, dst=None):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)
+    return binary
+
+def clahe_otsu(gray):
+    return otsu(median(clahe(gray)))
+
+def inverted(gray):
+    """Светлый текст на темном фоне (темные темы)"""
+    return clahe_otsu(cv2.bitwise_not(gray))
+
+def adaptive(gray):
+    """Неравномерное освещение и градиентные фоны"""
+    denoised = cv2.medianBlur(gray, 3)
+    return cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+def no_binarize(gray):
+    """Только выравнивание контраста — для сглаженного и цветного текста"""
+    return clahe(gray)
+
+def sharpen(gray):
+    """Нерезкая маска для размытых скриншотов и масштабированных изображений"""
+    blurred = cv2.GaussianBlur(gray, (0, 0), 1.0)
+    return cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
+
+# 'original' — изображение без предобработки, его передают в OCR как есть
+PREPROCESS_VARIANTS = {
+    'clahe_otsu': clahe_otsu,
+    'inverted': inverted,
+    'adaptive': adaptive,
+    'no_binarize': no_binarize,
+    'sharpen': sharpen,
+}
+
+# Варианты с CLAHE по шагам для обработки полосами: (до CLAHE, после CLAHE, порог Оцу)
+CLAHE_STAGES = {
+    'clahe_otsu': (None, median, True),
+    'inverted': (cv2.bitwise_not, median, True),
+    'no_binarize': (None, None, False),
+}
+
+def image_stats(gray):
+    """Быстрая статистика по прореженному изображению: яркость, контраст, полярность фона"""
+    sample = gray[::4, ::4]
+    histogram = np.bincount(sample.ravel(), minlength=256)
+    background = int(np.argmax(histogram))
+    mean = float(sample.mean())
+    return {
+        'mean': mean,
+        'contrast': float(sample.std()),
+        'background': background,
+        'dark_background': background < 96 or (background < 128 and mean < 110),
+    }
+
+def heuristic_order(stats):
+    if stats['dark_background']:
+        order = ['inverted', 'original', 'no_binarize', 'adaptive', 'clahe_otsu', 'sharpen']
+    elif stats['contrast'] < 35:
+        order = ['clahe_otsu', 'no_binarize', 'adaptive', 'original', 'sharpen', 'inverted']
+    else:
+        order = ['original', 'clahe_otsu', 'sharpen', 'adaptive', 'no_binarize', 'inverted']
+    return order
+
+class PreprocessSelector:
+    """Выбор варианта предобработки по статистике изображения и накопленным победам.
+
+    Победы учитываются отдельно для каждого источника (область, экран, буфер, файл)
+    и полярности фона, поэтому порядок вариантов подстраивается под реальные данные.
+    Счетчики живут только в памяти процесса и обнуляются при каждом запуске.
+    """
+
+    def __init__(self):
+        self.wins = {}
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def _key(self, source, stats):
+        return (source, stats['dark_background'])
+
+    def order(self, source, stats):
+        base = heuristic_order(stats)
+        with self.lock:
+            wins = dict(self.wins.get(self._key(source, stats), {}))
+        return sorted(base, key=lambda variant: (-wins.get(variant, 0), base.index(variant)))
+
+    def explore(self, source, stats, untried):
+        """Вариант для дополнительного прохода: тот, что реже всего запускался для этого ключа"""
+        if not untried:
+            return None
+        with self.lock:
+            runs = dict(self.runs.get(self._key(source, stats), {}))
+        return min(untried, key=lambda variant: (runs.get(variant, 0), untried.index(variant)))
+
+    def record(self, source, stats, variant, tried=()):
+        with self.lock:
+            key = self._key(source, stats)
+            runs = self.runs.setdefault(key, {})
+            for tried_variant in tried:
+                runs[tried_variant] = runs.get(tried_variant, 0) + 1
+            if variant is not None:
+                counts = self.wins.setdefault(key, {})
+                counts[variant] = counts.get(variant, 0) + 1
+
+def confidence_score(results):
+    """Сумма уверенности по символам, прошедшим порог format_results.
+
+    Равна средней уверенности, умноженной на объем уверенно распознанного текста:
+    одно слово с уверенностью 0.9 не перевешивает весь экран с уверенностью 0.55.
+    """
+    score = 0.0
+    for result in results:
+        text = result[1].strip()
+        if text and result[2] > (0.2 if len(text) > 2 else 0.4):
+            score += result[2] * len(text)
+    return score
+
+def apply_variant(variant, gray):
+    return PREPROCESS_VARIANTS[variant](gray)
+
+def _local_strips(variant, gray, output, strip_height, overlap):
+    height = gray.shape[0]
+    for top in range(0, height, strip_height):
+        bottom = min(height, top + strip_height)
+        start = max(0, top - overlap)
+        end = min(height, bottom + overlap)
+        processed = apply_variant(variant, gray[start:end])
+        output[top:bottom] = processed[top - start:bottom - start]
+        del processed
+
+def _clahe_strips(variant, gray, output, strip_height):
+    """CLAHE полосами, выровненными по строкам плиток, с перекрытием в одну плитку.
+
+    Кадр дополняется так же, как это делает OpenCV для всего изображения, поэтому
+    гистограммы плиток совпадают с обработкой целиком; интерполяция между плитками
+    отличается лишь округлением (единичные пиксели на ±1 уровень яркости).
+    Порог Оцу считается один раз по собранному буферу и применяется на месте.
+    """
+    before, after, binarize = CLAHE_STAGES[variant]
+    height, width = gray.shape
+    if height % CLAHE_TILES or width % CLAHE_TILES:
+        pad_bottom = CLAHE_TILES - height % CLAHE_TILES
+        pad_right = CLAHE_TILES - width % CLAHE_TILES
+    else:
+        pad_bottom = pad_right = 0
+    tile_height = (height + pad_bottom) // CLAHE_TILES
+    rows_per_strip = max(1, strip_height // tile_height)
+
+    for first_row in range(0, CLAHE_TILES, rows_per_strip):
+        last_row = min(CLAHE_TILES, first_row + rows_per_strip)
+        start_row, end_row = max(0, first_row - 1), min(CLAHE_TILES, last_row + 1)
+        start = start_row * tile_height
+        end = min(height, end_row * tile_height)
+
+        strip = gray[start:end]
+        if before is not None:
+            strip = before(strip)
+        strip = cv2.copyMakeBorder(
+            strip, 0, pad_bottom if end_row == CLAHE_TILES else 0, 0, pad_right, cv2.BORDER_REFLECT_101
+        )
+        processed = clahe(strip, end_row - start_row)[:end - start, :width]
+        if after is not None:
+            processed = after(processed)
+
+        top, bottom = first_row * tile_height, min(height, last_row * tile_height)
+        output[top:bottom] = processed[top - start:bottom - start]
+        del strip, processed
+
+    if binarize:
+        otsu(output, dst=output)
+
+def apply_variant_strips(variant, gray, strip_height=STRIP_HEIGHT, overlap=STRIP_OVERLAP):
+    """Предобработка большого кадра горизонтальными полосами в заранее выделенный буфер.
+
+    Локальные варианты (LOCAL_VARIANTS) режутся с перекрытием, покрывающим радиус
+    фильтров; варианты с CLAHE — по строкам плиток (см. _clahe_strips). Результат
+    совпадает с обработкой всего кадра (для CLAHE — с точностью до округления).
+    """
+    height = gray.shape[0]
+    if height <= strip_height + overlap:
+        return apply_variant(variant, gray)
+
+    output = np.empty_like(gray)
+    if variant in CLAHE_STAGES:
+        _clahe_strips(variant, gray, output, strip_height)
+    else:
+        _local_strips(variant, gray, output, strip_height, overlap)
+    return output